@@ -1,9 +1,12 @@
 import os
+import io
+import hashlib
 import logging
-from flask import Flask, render_template, request, jsonify, send_file
+import traceback
+import orjson
+from flask import Flask, Response, render_template, request, send_file
 from werkzeug.utils import secure_filename
-import tempfile
-from sql_parser import parse_sql_query, reconstruct_sql_query
+from sql_parser import Condition, parse_sql_batch, parse_sql_query, reconstruct_sql_query
 from forms import SQLQueryForm
 
 # Configuração de logging
@@ -13,6 +16,34 @@ logging.basicConfig(level=logging.DEBUG)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "default_secret_key")
 
+# Campos das condições enviados ao cliente: só o necessário para exibir e reconstruir
+OUTGOING_KEYS = ('id', 'field', 'operator', 'value', 'type', 'is_function')
+
+def _json(payload, status=200):
+    """Serializa a resposta com orjson (dicionários e dataclasses, direto em bytes)."""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+def _condition_payload(condition):
+    """Reduz uma condição aos campos de OUTGOING_KEYS para a resposta JSON."""
+    return {key: getattr(condition, key) for key in OUTGOING_KEYS}
+
+def _with_etag(response, etag):
+    """Marca a resposta com o ETag e exige revalidação a cada uso do cache."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
+
+def _statements_payload(statements):
+    """Monta a lista de instruções de um lote, cada uma com suas condições."""
+    return [
+        {'query': statement, 'conditions': [_condition_payload(condition) for condition in conditions]}
+        for statement, conditions in statements
+    ]
+
+def _is_batch_request():
+    """Indica se o cliente pediu a análise de todas as instruções (campo 'batch')."""
+    return request.form.get('batch', '').lower() in ('1', 'true', 'on')
+
 # Rotas da aplicação
 @app.route('/', methods=['GET'])
 def index():
@@ -26,103 +57,121 @@ def parse_query():
     try:
         query = request.form.get('query', '')
         if not query.strip():
-            return jsonify({'error': 'Consulta SQL vazia. Por favor, forneça uma consulta válida.'}), 400
+            return _json({'error': 'Consulta SQL vazia. Por favor, forneça uma consulta válida.'}, 400)
+        
+        # A resposta depende só do texto da consulta (e do modo lote): se o cliente
+        # já tem esta versão, responde 304 sem analisar nem serializar nada
+        batch = _is_batch_request()
+        etag = hashlib.blake2b(query.encode('utf-8'), digest_size=16,
+                               person=b'batch' if batch else b'').hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            return _with_etag(Response(status=304), etag)
+        
+        # Modo lote: analisa todas as instruções da consulta
+        if batch:
+            return _with_etag(_json({
+                'status': 'success',
+                'statements': _statements_payload(parse_sql_batch(query))
+            }), etag)
         
         # Analisar a consulta SQL
         parsed_conditions = parse_sql_query(query)
         
         # Verifica se existe uma cláusula WHERE na consulta
         if not parsed_conditions:
-            return jsonify({
+            return _with_etag(_json({
                 'status': 'no_where',
                 'query': query,
                 'message': 'Não foi possível identificar condições WHERE na consulta.'
-            })
+            }), etag)
             
         # Retorna as condições extraídas em formato JSON
-        return jsonify({
+        return _with_etag(_json({
             'status': 'success',
             'query': query,
-            'conditions': parsed_conditions
-        })
+            'conditions': [_condition_payload(condition) for condition in parsed_conditions]
+        }), etag)
     except Exception as e:
         logging.error(f"Erro ao analisar consulta: {str(e)}")
-        return jsonify({'error': f'Erro ao analisar a consulta: {str(e)}'}), 500
+        return _json({'error': f'Erro ao analisar a consulta: {str(e)}'}, 500)
 
 @app.route('/upload_sql', methods=['POST'])
 def upload_sql():
     """Processa o upload de um arquivo SQL."""
     try:
         if 'sqlFile' not in request.files:
-            return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
+            return _json({'error': 'Nenhum arquivo selecionado'}, 400)
             
         file = request.files['sqlFile']
         
         if file.filename == '':
-            return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
+            return _json({'error': 'Nenhum arquivo selecionado'}, 400)
             
         if file and file.filename.endswith('.sql'):
-            # Lê o conteúdo do arquivo
+            # Lê o conteúdo do arquivo (decodificado de uma vez; as quebras de linha ficam como enviadas)
             sql_content = file.read().decode('utf-8')
-            return jsonify({'status': 'success', 'query': sql_content})
+            if _is_batch_request():
+                return _json({
+                    'status': 'success',
+                    'query': sql_content,
+                    'statements': _statements_payload(parse_sql_batch(sql_content))
+                })
+            return _json({'status': 'success', 'query': sql_content})
         else:
-            return jsonify({'error': 'Arquivo inválido. Por favor, envie um arquivo .sql'}), 400
+            return _json({'error': 'Arquivo inválido. Por favor, envie um arquivo .sql'}, 400)
     except Exception as e:
         logging.error(f"Erro no upload de arquivo: {str(e)}")
-        return jsonify({'error': f'Erro no processamento do arquivo: {str(e)}'}), 500
+        return _json({'error': f'Erro no processamento do arquivo: {str(e)}'}, 500)
 
 @app.route('/reconstruct_query', methods=['POST'])
 def reconstruct_query():
     """Reconstrói a consulta SQL com as condições modificadas."""
     try:
-        data = request.json
+        data = orjson.loads(request.get_data())
         original_query = data.get('original_query', '')
         modified_conditions = data.get('modified_conditions', [])
         
         # Log detalhado para depuração
-        logging.debug(f"Recebido para reconstrução - Consulta original: {original_query}")
-        logging.debug(f"Condições modificadas: {modified_conditions}")
+        logging.debug("Recebido para reconstrução - Consulta original: %s", original_query)
+        logging.debug("Condições modificadas: %s", modified_conditions)
         
         if not original_query or not modified_conditions:
-            return jsonify({'error': 'Dados incompletos para reconstrução da consulta'}), 400
+            return _json({'error': 'Dados incompletos para reconstrução da consulta'}, 400)
             
         # Reconstruir a consulta SQL
-        reconstructed_query = reconstruct_sql_query(original_query, modified_conditions)
+        conditions = [Condition.from_dict(condition) for condition in modified_conditions]
+        reconstructed_query = reconstruct_sql_query(original_query, conditions)
         
         # Log da consulta reconstruída
-        logging.debug(f"Consulta reconstruída: {reconstructed_query}")
+        logging.debug("Consulta reconstruída: %s", reconstructed_query)
         
-        return jsonify({
+        return _json({
             'status': 'success',
             'reconstructed_query': reconstructed_query
         })
     except Exception as e:
         logging.error(f"Erro na reconstrução da consulta: {str(e)}")
         # Exibe o traceback para facilitar a depuração
-        import traceback
         logging.error(traceback.format_exc())
-        return jsonify({'error': f'Erro ao reconstruir a consulta: {str(e)}'}), 500
+        return _json({'error': f'Erro ao reconstruir a consulta: {str(e)}'}, 500)
 
 @app.route('/download_sql', methods=['POST'])
 def download_sql():
     """Gera um arquivo SQL para download."""
     try:
-        data = request.json
+        data = orjson.loads(request.get_data())
         query = data.get('query', '')
         
         if not query:
-            return jsonify({'error': 'Consulta vazia. Não é possível gerar o arquivo.'}), 400
+            return _json({'error': 'Consulta vazia. Não é possível gerar o arquivo.'}, 400)
             
-        # Cria um arquivo temporário
-        fd, path = tempfile.mkstemp(suffix='.sql')
+        # Gera o arquivo em memória, sem passar pelo disco
+        buffer = io.BytesIO(query.encode('utf-8'))
         
-        with os.fdopen(fd, 'w') as tmp:
-            tmp.write(query)
-            
-        return send_file(path, as_attachment=True, download_name='consulta_modificada.sql', mimetype='text/plain')
+        return send_file(buffer, as_attachment=True, download_name='consulta_modificada.sql', mimetype='text/plain')
     except Exception as e:
         logging.error(f"Erro ao gerar arquivo para download: {str(e)}")
-        return jsonify({'error': f'Erro ao gerar o arquivo: {str(e)}'}), 500
+        return _json({'error': f'Erro ao gerar o arquivo: {str(e)}'}, 500)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,13 +1,182 @@
-import sqlparse
+import os
 import re
+import copy
+import functools
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime
 from typing import List, Dict, Any, Tuple, Optional
 
-# Configuração de logging
-logging.basicConfig(level=logging.DEBUG)
+# Logger do módulo; a configuração do logging fica a cargo da aplicação
+logger = logging.getLogger(__name__)
 
-def parse_sql_query(query: str) -> List[Dict[str, Any]]:
+# Expressões regulares pré-compiladas (evita recompilação a cada chamada)
+_TO_DATE_BETWEEN_RE = re.compile(
+    r'([^\s]+)\s+(?P<neg>NOT\s+)?BETWEEN\s+to_date\s*\(\s*([^,\)]+)\s*,\s*\'([^\']+)\'\s*\)\s+AND\s+to_date\s*\(\s*([^,\)]+)\s*,\s*\'([^\']+)\'\s*\)',
+    re.IGNORECASE
+)
+_WHERE_LEAD_RE = re.compile(r'^\s*WHERE\s+', re.IGNORECASE)
+_LEADING_CONNECTORS_RE = re.compile(r'^\s*(?:(?:AND|OR)\s+)*', re.IGNORECASE)
+_AND_SPLIT_RE = re.compile(r'\sAND\s', re.IGNORECASE)
+# Máscara para localizar AND/OR com str.find: troca qualquer espaço em branco por
+# ' ' e põe em maiúsculas as letras dos conectores, sem mudar o tamanho do texto
+_CONNECTOR_MASK = str.maketrans(
+    {**{chr(i): ' ' for i in range(0x3001) if chr(i).isspace()}, 'a': 'A', 'n': 'N', 'd': 'D', 'o': 'O', 'r': 'R'}
+)
+
+# Literais (com escapes por barra invertida) e hints (grupo 1) são mantidos;
+# comentários de linha (-- e '# ', como no sqlparse) e de bloco são removidos
+_COMMENT_RE = re.compile(
+    r"""('(?:''|\\.|[^'\\])*'|"(?:""|\\.|[^"\\])*"|/\*\+.*?\*/|(?:--|# )\+[^\r\n]*)|(?:--|# )[^\r\n]*|/\*.*?\*/""",
+    re.DOTALL
+)
+_WHERE_RECON_RE = re.compile(r'(.*)\s+WHERE\s+(.*)', re.IGNORECASE | re.DOTALL)
+_FALLBACK_WHERE_RE = re.compile(
+    r'(.*\s+WHERE\s+).*?(\s+GROUP BY.*|\s+ORDER BY.*|\s+HAVING.*|\s+LIMIT.*|;|$)',
+    re.IGNORECASE
+)
+_FALLBACK_WHERE_TAIL_RE = re.compile(r'(.*\s+WHERE\s+).*?($)', re.IGNORECASE)
+
+# Detecção de tipos: caracteres que podem iniciar um número e formatos de data
+# aceitos, indexados por (ano primeiro, separador, com horário)
+_NUMBER_LEADING_CHARS = frozenset('0123456789+-.')
+_DATE_SHAPE_RE = re.compile(
+    r'^(?:(?P<ymd>\d{4}(?P<sep1>[-/])\d{1,2}(?P=sep1)\d{1,2})|\d{1,2}(?P<sep2>[-/])\d{1,2}(?P=sep2)\d{4})'
+    r'(?P<time> \d{1,2}:\d{1,2}:\d{1,2})?$'
+)
+_DATE_PATTERNS = {
+    (True, '-', False): '%Y-%m-%d',
+    (False, '/', False): '%d/%m/%Y',
+    (True, '/', False): '%Y/%m/%d',
+    (False, '-', False): '%d-%m-%Y',
+    (True, '-', True): '%Y-%m-%d %H:%M:%S',
+    (False, '/', True): '%d/%m/%Y %H:%M:%S',
+}
+
+# Operadores suportados e suas descrições amigáveis
+_OPERATOR_DESCRIPTIONS = {
+    '=': 'igual',
+    '!=': 'diferente',
+    '<>': 'diferente',
+    '>': 'maior',
+    '<': 'menor',
+    '>=': 'maior ou igual',
+    '<=': 'menor ou igual',
+    'LIKE': 'contém',
+    'NOT LIKE': 'não contém',
+    'IN': 'em',
+    'NOT IN': 'não em',
+    'BETWEEN': 'entre',
+    'NOT BETWEEN': 'não entre',
+    'IS NULL': 'é nulo',
+    'IS NOT NULL': 'não é nulo'
+}
+
+# O sqlparse é importado só no primeiro uso (ver _get_sqlparse)
+_sqlparse = None
+
+def _get_sqlparse() -> Any:
+    """
+    Importa o sqlparse sob demanda, evitando o custo no carregamento do módulo.
+    
+    Returns:
+        Módulo sqlparse
+    """
+    global _sqlparse
+    if _sqlparse is None:
+        import sqlparse as _sqlparse_mod
+        _sqlparse = _sqlparse_mod
+    return _sqlparse
+
+# Tamanho máximo dos caches de consultas já analisadas
+_QUERY_CACHE_SIZE = 256
+
+# Análise em lote: acima deste número de instruções usa vários processos
+# (o sqlparse é Python puro e preso ao GIL, então threads não ajudariam)
+_PARALLEL_BATCH_THRESHOLD = 4
+# Blocos por processo em cada lote, para equilibrar instruções de custo desigual
+_PARALLEL_BATCH_CHUNKS_PER_WORKER = 4
+
+# Pool de processos compartilhado pelos lotes, criado no primeiro uso
+_batch_executor: Optional[ProcessPoolExecutor] = None
+_batch_executor_lock = threading.Lock()
+
+def _get_batch_executor() -> ProcessPoolExecutor:
+    """
+    Cria sob demanda o pool de processos usado por parse_sql_batch.
+    
+    Os processos são iniciados por forkserver (spawn onde não houver), e não
+    com fork a partir de um worker do servidor que já tem várias threads.
+    
+    Returns:
+        Pool de processos compartilhado
+    """
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _batch_executor = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+        return _batch_executor
+
+def _discard_batch_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Descarta o pool compartilhado quebrado, para que o próximo lote crie outro.
+    
+    Args:
+        executor: Pool que falhou
+    """
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is executor:
+            _batch_executor = None
+    executor.shutdown(wait=False)
+
+@dataclass(slots=True)
+class Condition:
+    """Condição individual extraída da cláusula WHERE."""
+    id: int
+    field: str
+    operator: str
+    value: Any
+    type: str
+    operator_desc: str = ''
+    is_function: bool = False
+    function_name: str = ''
+    format: str = ''
+    original_value: Any = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Condition':
+        """
+        Cria uma condição a partir de um dicionário (ex.: JSON enviado pelo cliente).
+        
+        Args:
+            data: Dicionário com os dados da condição; chaves ausentes usam o padrão
+        
+        Returns:
+            Condição correspondente
+        """
+        return cls(
+            id=data.get('id', 0),
+            field=data.get('field', ''),
+            operator=data.get('operator', ''),
+            value=data.get('value'),
+            type=data.get('type', 'text'),
+            operator_desc=data.get('operator_desc', ''),
+            is_function=data.get('is_function', False),
+            function_name=data.get('function_name', ''),
+            format=data.get('format', ''),
+            original_value=data.get('original_value')
+        )
+
+def parse_sql_query(query: str) -> List[Condition]:
     """
     Analisa uma consulta SQL e extrai as condições da cláusula WHERE.
     
@@ -15,136 +184,240 @@ def parse_sql_query(query: str) -> List[Dict[str, Any]]:
         query: String contendo a consulta SQL
     
     Returns:
-        Lista de dicionários contendo informações sobre cada condição
+        Lista de condições encontradas
+    """
+    # O resultado em cache é compartilhado; devolve uma cópia mutável
+    return copy.deepcopy(list(_parse_sql_query_cached(query)))
+
+def parse_sql_batch(sql_content: str) -> List[Tuple[str, List[Condition]]]:
+    """
+    Divide um script SQL em instruções e extrai as condições WHERE de cada uma.
+    
+    Args:
+        sql_content: String contendo uma ou mais instruções SQL
+    
+    Returns:
+        Lista de pares (instrução, condições encontradas), na ordem do script
+    """
+    statements = []
+    for statement in _get_sqlparse().split(sql_content):
+        statement = statement.strip()
+        if statement.endswith(';'):
+            statement = statement[:-1].rstrip()
+        # Ignora trechos que só contêm comentários
+        if _strip_comments(statement).strip():
+            statements.append(statement)
+    
+    workers = min(os.cpu_count() or 1, len(statements))
+    if workers > 1 and len(statements) > _PARALLEL_BATCH_THRESHOLD:
+        executor = _get_batch_executor()
+        chunksize = max(1, len(statements) // (workers * _PARALLEL_BATCH_CHUNKS_PER_WORKER))
+        try:
+            return list(zip(statements, executor.map(parse_sql_query, statements, chunksize=chunksize)))
+        except BrokenProcessPool:
+            logger.warning("Pool de processos da análise em lote falhou; analisando em série")
+            _discard_batch_executor(executor)
+    
+    results = [parse_sql_query(statement) for statement in statements]
+    
+    return list(zip(statements, results))
+
+@functools.lru_cache(maxsize=_QUERY_CACHE_SIZE)
+def _parse_sql_query_cached(query: str) -> Tuple[Condition, ...]:
+    """
+    Versão memoizada de parse_sql_query; não deve ter o resultado alterado.
+    
+    Args:
+        query: String contendo a consulta SQL
+    
+    Returns:
+        Tupla de condições encontradas
     """
     try:
-        # Normaliza a consulta (remove comentários, espaços extras, etc.)
-        formatted_query = sqlparse.format(query, strip_comments=False, reindent=False)
-        
-        # Parse a consulta
-        parsed = sqlparse.parse(formatted_query)
+        # Parse a consulta (tokenizada uma única vez)
+        parsed = _get_sqlparse().parse(query)
         
         if not parsed:
-            logging.error("Não foi possível fazer o parsing da consulta")
-            return []
+            logger.error("Não foi possível fazer o parsing da consulta")
+            return ()
             
         # Obtém a primeira declaração
         stmt = parsed[0]
         
-        # Procura a cláusula WHERE usando a API do sqlparse
-        where_tokens = []
+        # Procura a primeira cláusula WHERE usando a API do sqlparse
+        where_token = _first_where(stmt.tokens)
         
-        # Função recursiva para encontrar tokens WHERE em qualquer nível
-        def find_where_tokens(token_list):
-            found_tokens = []
-            for token in token_list:
-                if isinstance(token, sqlparse.sql.Where):
-                    found_tokens.append(token)
-                if hasattr(token, 'tokens'):
-                    found_tokens.extend(find_where_tokens(token.tokens))
-            return found_tokens
-        
-        # Procura cláusulas WHERE em qualquer nível da consulta
-        where_tokens = find_where_tokens(stmt.tokens)
-        
-        if not where_tokens:
-            logging.warning("Cláusula WHERE não encontrada na consulta")
-            return []
-            
-        # Pega o primeiro token WHERE encontrado
-        where_token = where_tokens[0]
+        if where_token is None:
+            logger.warning("Cláusula WHERE não encontrada na consulta")
+            return ()
         
         # Extrai a cláusula WHERE sem a palavra-chave WHERE
-        where_clause = ''.join(str(t) for t in where_token.tokens[1:])
+        where_clause = _WHERE_LEAD_RE.sub('', where_token.value, count=1)
         
         # Extrai as condições
-        return extract_conditions(where_clause, formatted_query)
+        return tuple(extract_conditions(where_clause, query))
     except Exception as e:
-        logging.error(f"Erro ao analisar a consulta SQL: {str(e)}")
-        return []
+        logger.error("Erro ao analisar a consulta SQL: %s", e)
+        return ()
+
+def _first_where(tokens: List[Any]) -> Optional[Any]:
+    """
+    Encontra o primeiro token WHERE da consulta (busca em profundidade iterativa).
+    
+    Listas de identificadores e parênteses, onde só poderia haver o WHERE
+    de uma subconsulta, ficam para depois: só são examinados quando não há
+    WHERE no nível de cima (ex.: consulta inteira entre parênteses).
+    
+    Args:
+        tokens: Lista de tokens do sqlparse
+    
+    Returns:
+        Primeiro token sqlparse.sql.Where encontrado, ou None
+    """
+    sql = _get_sqlparse().sql
+    stack = list(reversed(tokens))
+    deferred = []
+    while stack:
+        token = stack.pop()
+        if isinstance(token, sql.Where):
+            return token
+        if isinstance(token, (sql.IdentifierList, sql.Parenthesis)):
+            deferred.append(token)
+            continue
+        if token.is_group:
+            stack.extend(reversed(token.tokens))
+    for group in deferred:
+        where_token = _first_where(group.tokens)
+        if where_token is not None:
+            return where_token
+    return None
 
-def extract_conditions(where_clause: str, full_query: str) -> List[Dict[str, Any]]:
+def extract_conditions(where_clause: str, full_query: str) -> List[Condition]:
     """
     Extrai condições individuais da cláusula WHERE.
     
     Args:
-        where_clause: String contendo a cláusula WHERE
+        where_clause: String contendo a cláusula WHERE, sem a palavra-chave WHERE
         full_query: String contendo a consulta SQL completa
     
     Returns:
-        Lista de dicionários contendo informações sobre cada condição
+        Lista de condições encontradas
     """
     conditions = []
     
-    # Remove a palavra-chave WHERE se estiver presente no início
-    where_clause = re.sub(r'^\s*WHERE\s+', '', where_clause, flags=re.IGNORECASE)
+    # Antes de dividir em AND/OR, extrai todos os padrões especiais de BETWEEN com TO_DATE
+    to_date_matches = list(_TO_DATE_BETWEEN_RE.finditer(where_clause))
     
-    # Antes de dividir em AND/OR, verifica se há um padrão especial de BETWEEN com TO_DATE
-    to_date_pattern = r'([^\s]+)\s+(?:NOT\s+)?BETWEEN\s+to_date\s*\(\s*([^,\)]+)\s*,\s*\'([^\']+)\'\s*\)\s+AND\s+to_date\s*\(\s*([^,\)]+)\s*,\s*\'([^\']+)\'\s*\)'
-    to_date_match = re.search(to_date_pattern, where_clause, re.IGNORECASE)
+    for condition_id, to_date_match in enumerate(to_date_matches):
+        conditions.append(_to_date_between_condition(to_date_match, condition_id))
     
-    if to_date_match:
-        field = to_date_match.group(1).strip()
-        start_param = to_date_match.group(2).strip()
-        start_format = to_date_match.group(3).strip()
-        end_param = to_date_match.group(4).strip()
-        end_format = to_date_match.group(5).strip()
-        
-        condition_text = to_date_match.group(0)
-        
-        # Verifica se há NOT antes de BETWEEN
-        is_not_between = 'NOT' in condition_text.upper().split('BETWEEN')[0]
-        
-        condition = {
-            'id': 0,
-            'field': field,
-            'operator': 'NOT BETWEEN' if is_not_between else 'BETWEEN',
-            'operator_desc': 'não entre' if is_not_between else 'entre',
-            'value': [
-                f"to_date({start_param}, '{start_format}')",
-                f"to_date({end_param}, '{end_format}')"
-            ],
-            'original_value': [start_param, end_param],
-            'type': 'date',
-            'is_function': True,
-            'function_name': 'to_date',
-            'format': start_format
-        }
-        
-        conditions.append(condition)
-        
-        # Divide o resto da cláusula WHERE pela condição que acabamos de processar
-        remaining_clause = where_clause.replace(condition_text, '')
-        if remaining_clause.strip():
-            # Se houver mais condições, processá-las recursivamente
-            if remaining_clause.strip().startswith('AND '):
-                remaining_clause = remaining_clause.strip()[4:]  # Remove o "AND " do início
-            elif remaining_clause.strip().startswith('OR '):
-                remaining_clause = remaining_clause.strip()[3:]  # Remove o "OR " do início
-                
-            more_conditions = extract_conditions(remaining_clause, full_query)
-            for i, cond in enumerate(more_conditions):
-                cond['id'] = i + 1  # Atualize os IDs para continuarem a sequência
-                conditions.append(cond)
-    else:
-        # Análise básica de condições AND e OR quando não há padrão especial
-        and_parts = re.split(r'\sAND\s', where_clause, flags=re.IGNORECASE)
-        
-        condition_id = 0
-        for and_part in and_parts:
-            or_parts = re.split(r'\sOR\s', and_part, flags=re.IGNORECASE)
-            for or_part in or_parts:
-                condition = or_part.strip()
-                if condition:
-                    # Análise de diferentes tipos de operadores
-                    parsed_condition = parse_condition(condition, condition_id)
-                    if parsed_condition:
-                        conditions.append(parsed_condition)
-                        condition_id += 1
+    # Corta a cláusula nas condições que acabamos de processar; cada trecho
+    # restante perde os AND/OR que sobrarem nas pontas
+    bounds = [0] + [pos for match in to_date_matches for pos in match.span()] + [len(where_clause)]
+    gaps = [_trim_connectors(where_clause[start:end]) for start, end in zip(bounds[::2], bounds[1::2])]
+    
+    # Análise básica de condições AND e OR no restante da cláusula
+    condition_id = len(conditions)
+    for gap in gaps:
+        for part in _split_connectors(gap):
+            condition = part.strip()
+            if condition:
+                # Análise de diferentes tipos de operadores
+                parsed_condition = parse_condition(condition, condition_id)
+                if parsed_condition:
+                    conditions.append(parsed_condition)
+                    condition_id += 1
     
     return conditions
 
-def parse_condition(condition: str, condition_id: int) -> Optional[Dict[str, Any]]:
+def _trim_connectors(text: str) -> str:
+    """
+    Remove os conectores AND/OR que sobram nas pontas de um trecho da cláusula.
+    
+    Args:
+        text: Trecho da cláusula WHERE
+    
+    Returns:
+        Trecho sem espaços nem conectores nas pontas
+    """
+    text = _LEADING_CONNECTORS_RE.sub('', text, count=1).rstrip()
+    while text:
+        words = text.rsplit(None, 1)
+        if words[-1].upper() not in ('AND', 'OR'):
+            break
+        text = words[0].rstrip() if len(words) > 1 else ''
+    return text
+
+def _split_connectors(where_clause: str) -> List[str]:
+    """
+    Divide a cláusula WHERE nos conectores AND e, dentro de cada parte, OR.
+    
+    As posições dos conectores são buscadas com str.find numa máscara do
+    mesmo tamanho da cláusula (espaços normalizados e letras de AND/OR em
+    maiúsculas), e as partes são fatiadas direto da cláusula original.
+    
+    Args:
+        where_clause: String contendo a cláusula WHERE
+    
+    Returns:
+        Lista com o texto de cada condição, na ordem em que aparecem
+    """
+    mask = where_clause.translate(_CONNECTOR_MASK)
+    parts = []
+    for and_start, and_end in _connector_spans(mask, ' AND ', 0, len(mask)):
+        for or_start, or_end in _connector_spans(mask, ' OR ', and_start, and_end):
+            parts.append(where_clause[or_start:or_end])
+    return parts
+
+def _connector_spans(mask: str, connector: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """Intervalos entre as ocorrências de um conector em mask[start:end]."""
+    spans = []
+    position = mask.find(connector, start, end)
+    while position >= 0:
+        spans.append((start, position))
+        start = position + len(connector)
+        position = mask.find(connector, start, end)
+    spans.append((start, end))
+    return spans
+
+def _to_date_between_condition(match: re.Match, condition_id: int) -> Condition:
+    """
+    Monta a condição de um BETWEEN com TO_DATE nos dois limites.
+    
+    Args:
+        match: Resultado de _TO_DATE_BETWEEN_RE para a condição
+        condition_id: Identificador único para a condição
+    
+    Returns:
+        Condição correspondente
+    """
+    # O grupo nomeado 'neg' também é numerado (grupo 2)
+    field = match.group(1).strip()
+    start_param = match.group(3).strip()
+    start_format = match.group(4).strip()
+    end_param = match.group(5).strip()
+    end_format = match.group(6).strip()
+    
+    # Verifica se há NOT antes de BETWEEN (capturado pela própria regex)
+    is_not_between = match.group('neg') is not None
+    
+    return Condition(
+        id=condition_id,
+        field=field,
+        operator='NOT BETWEEN' if is_not_between else 'BETWEEN',
+        operator_desc='não entre' if is_not_between else 'entre',
+        value=[
+            f"to_date({start_param}, '{start_format}')",
+            f"to_date({end_param}, '{end_format}')"
+        ],
+        original_value=[start_param, end_param],
+        type='date',
+        is_function=True,
+        function_name='to_date',
+        format=start_format  # Assumindo que os dois formatos são iguais
+    )
+
+def parse_condition(condition: str, condition_id: int) -> Optional[Condition]:
     """
     Analisa uma condição individual e extrai campo, operador e valor.
     
@@ -153,104 +426,136 @@ def parse_condition(condition: str, condition_id: int) -> Optional[Dict[str, Any
         condition_id: Identificador único para a condição
     
     Returns:
-        Dicionário contendo informações sobre a condição
-    """
-    # Lista de operadores suportados
-    operators = {
-        '=': 'igual',
-        '!=': 'diferente',
-        '<>': 'diferente',
-        '>': 'maior',
-        '<': 'menor',
-        '>=': 'maior ou igual',
-        '<=': 'menor ou igual',
-        'LIKE': 'contém',
-        'NOT LIKE': 'não contém',
-        'IN': 'em',
-        'NOT IN': 'não em',
-        'BETWEEN': 'entre',
-        'NOT BETWEEN': 'não entre',
-        'IS NULL': 'é nulo',
-        'IS NOT NULL': 'não é nulo'
-    }
+        Condição correspondente
+    """
+    # Separa campo, operador e lado direito numa única varredura
+    tokens = _tokenize_condition(condition)
     
     # Caso especial para atendime.hr_atendimento between to_date(:data_inicio,'YYYY-MM-DD') and to_date(:data_fim,'YYYY-MM-DD')
-    special_between_pattern = r'([^\s]+)\s+(?:NOT\s+)?BETWEEN\s+to_date\s*\(\s*([^,\)]+)\s*,\s*\'([^\']+)\'\s*\)\s+AND\s+to_date\s*\(\s*([^,\)]+)\s*,\s*\'([^\']+)\'\s*\)'
-    special_between_match = re.match(special_between_pattern, condition, re.IGNORECASE)
-    if special_between_match:
-        field = special_between_match.group(1).strip()
-        start_param = special_between_match.group(2).strip()
-        start_format = special_between_match.group(3).strip()
-        end_param = special_between_match.group(4).strip()
-        end_format = special_between_match.group(5).strip()
-        
-        # Verifica se há NOT antes de BETWEEN
-        is_not_between = 'NOT' in condition.upper().split('BETWEEN')[0]
-        
-        return {
-            'id': condition_id,
-            'field': field,
-            'operator': 'NOT BETWEEN' if is_not_between else 'BETWEEN',
-            'operator_desc': 'não entre' if is_not_between else 'entre',
-            'value': [
-                f"to_date({start_param}, '{start_format}')",
-                f"to_date({end_param}, '{end_format}')"
-            ],
-            'original_value': [start_param, end_param],
-            'type': 'date',
-            'is_function': True,
-            'function_name': 'to_date',
-            'format': start_format  # Assumindo que os dois formatos são iguais
-        }
-    
-    # Padrões de regex para diferentes tipos de condições
-    patterns = [
-        # BETWEEN normal
-        (r'([^\s]+)\s+(?:NOT\s+)?BETWEEN\s+(.*?)\s+AND\s+(.*)', lambda m: {
-            'id': condition_id,
-            'field': m.group(1).strip(),
-            'operator': 'NOT BETWEEN' if 'NOT' in m.group(0).upper() else 'BETWEEN',
-            'value': [m.group(2).strip().strip("'\""), m.group(3).strip().strip("'\"")],
-            'type': detect_value_type(m.group(2).strip().strip("'\""))
-        }),
-        # IN
-        (r'([^\s]+)\s+(?:NOT\s+)?IN\s*\((.*)\)', lambda m: {
-            'id': condition_id,
-            'field': m.group(1).strip(),
-            'operator': 'NOT IN' if 'NOT' in m.group(0).upper() else 'IN',
-            'value': [v.strip().strip("'\"") for v in m.group(2).split(',')],
-            'type': detect_value_type(m.group(2).split(',')[0].strip().strip("'\""))
-        }),
-        # IS NULL / IS NOT NULL
-        (r'([^\s]+)\s+IS\s+(?:NOT\s+)?NULL', lambda m: {
-            'id': condition_id,
-            'field': m.group(1).strip(),
-            'operator': 'IS NOT NULL' if 'NOT' in m.group(0).upper() else 'IS NULL',
-            'value': None,
-            'type': 'null'
-        }),
-        # Operadores padrão
-        (r'([^\s]+)\s+(=|!=|<>|>|<|>=|<=|LIKE|NOT\s+LIKE)\s+(.*)', lambda m: {
-            'id': condition_id,
-            'field': m.group(1).strip(),
-            'operator': m.group(2).strip().upper(),
-            'value': m.group(3).strip().strip("'\""),
-            'type': detect_value_type(m.group(3).strip().strip("'\""))
-        }, re.IGNORECASE),
-    ]
-    
-    for pattern, handler, *flags in patterns:
-        match = re.match(pattern, condition, *flags) if flags else re.match(pattern, condition)
-        if match:
-            result = handler(match)
+    if tokens and tokens[1] == 'BETWEEN':
+        special_between_match = _TO_DATE_BETWEEN_RE.match(condition)
+        if special_between_match:
+            return _to_date_between_condition(special_between_match, condition_id)
+    
+    if tokens:
+        field, operator, is_not, rhs = tokens
+        handler = _CONDITION_HANDLERS.get(operator)
+        result = handler(field, operator, is_not, rhs, condition_id) if handler else None
+        if result:
             # Adiciona a descrição amigável do operador
-            result['operator_desc'] = operators.get(result['operator'].upper(), result['operator'])
+            result.operator_desc = _OPERATOR_DESCRIPTIONS.get(result.operator.upper(), result.operator)
             return result
     
-    logging.warning(f"Não foi possível analisar a condição: {condition}")
+    logger.warning("Não foi possível analisar a condição: %s", condition)
     return None
 
-def detect_value_type(value: str) -> str:
+def _tokenize_condition(condition: str) -> Optional[Tuple[str, str, bool, str]]:
+    """
+    Divide uma condição em campo, operador e lado direito.
+    
+    O campo é a primeira palavra e o operador a seguinte (precedida ou não
+    de NOT), então basta uma varredura da string para achar o operador.
+    
+    Args:
+        condition: String contendo uma condição
+    
+    Returns:
+        Tupla (campo, operador em maiúsculas, se há NOT, lado direito) ou None
+    """
+    parts = condition.split(None, 1)
+    if len(parts) < 2:
+        return None
+    field, rest = parts
+    
+    is_not = rest[:3].upper() == 'NOT' and rest[3:4].isspace()
+    if is_not:
+        rest = rest[4:].lstrip()
+    
+    # IN aceita o parêntese colado ao operador: campo IN(1, 2)
+    if rest[:2].upper() == 'IN' and rest[2:].lstrip().startswith('('):
+        return field, 'IN', is_not, rest[2:].lstrip()
+    
+    parts = rest.split(None, 1)
+    # O operador precisa ser seguido de espaço em branco
+    if not parts or len(parts[0]) == len(rest):
+        return None
+    operator = parts[0].upper()
+    
+    # NOT só é aceito antes de BETWEEN, IN e LIKE
+    if is_not and operator not in ('BETWEEN', 'LIKE'):
+        return None
+    return field, operator, is_not, parts[1] if len(parts) > 1 else ''
+
+def _handle_between(field: str, operator: str, is_not: bool, rhs: str, condition_id: int) -> Optional[Condition]:
+    """Trata condições BETWEEN / NOT BETWEEN."""
+    bounds = _AND_SPLIT_RE.split(rhs, maxsplit=1)
+    if len(bounds) < 2:
+        return None
+    start = bounds[0].strip().strip("'\"")
+    return Condition(
+        id=condition_id,
+        field=field,
+        operator='NOT BETWEEN' if is_not else 'BETWEEN',
+        value=[start, bounds[1].strip().strip("'\"")],
+        type=detect_value_type(start)
+    )
+
+def _handle_in(field: str, operator: str, is_not: bool, rhs: str, condition_id: int) -> Optional[Condition]:
+    """Trata condições IN / NOT IN."""
+    close = rhs.rfind(')')
+    if close < 1:
+        return None
+    values = [v.strip().strip("'\"") for v in rhs[1:close].split(',')]
+    return Condition(
+        id=condition_id,
+        field=field,
+        operator='NOT IN' if is_not else 'IN',
+        value=values,
+        type=detect_value_type(values[0])
+    )
+
+def _handle_is_null(field: str, operator: str, is_not: bool, rhs: str, condition_id: int) -> Optional[Condition]:
+    """Trata condições IS NULL / IS NOT NULL."""
+    is_not_null = rhs[:3].upper() == 'NOT' and rhs[3:4].isspace()
+    if is_not_null:
+        rhs = rhs[4:].lstrip()
+    if rhs[:4].upper() != 'NULL':
+        return None
+    return Condition(
+        id=condition_id,
+        field=field,
+        operator='IS NOT NULL' if is_not_null else 'IS NULL',
+        value=None,
+        type='null'
+    )
+
+def _handle_comparison(field: str, operator: str, is_not: bool, rhs: str, condition_id: int) -> Optional[Condition]:
+    """Trata os operadores padrão (=, !=, <>, >, <, >=, <=, LIKE, NOT LIKE)."""
+    value = rhs.strip().strip("'\"")
+    return Condition(
+        id=condition_id,
+        field=field,
+        operator='NOT LIKE' if is_not else operator,
+        value=value,
+        type=detect_value_type(value)
+    )
+
+# Tabela de despacho: operador (sem NOT) -> função que monta a condição
+_CONDITION_HANDLERS = {
+    'BETWEEN': _handle_between,
+    'IN': _handle_in,
+    'IS': _handle_is_null,
+    '=': _handle_comparison,
+    '!=': _handle_comparison,
+    '<>': _handle_comparison,
+    '>': _handle_comparison,
+    '<': _handle_comparison,
+    '>=': _handle_comparison,
+    '<=': _handle_comparison,
+    'LIKE': _handle_comparison,
+}
+
+def detect_value_type(value: Optional[str]) -> str:
     """
     Detecta o tipo de um valor.
     
@@ -263,34 +568,32 @@ def detect_value_type(value: str) -> str:
     if value is None:
         return 'null'
     
-    # Tenta converter para número
-    try:
-        float(value)
-        return 'number'
-    except ValueError:
-        pass
-    
-    # Tenta converter para data
-    date_patterns = [
-        '%Y-%m-%d',
-        '%d/%m/%Y',
-        '%Y/%m/%d',
-        '%d-%m-%Y',
-        '%Y-%m-%d %H:%M:%S',
-        '%d/%m/%Y %H:%M:%S'
-    ]
-    
-    for pattern in date_patterns:
+    # Tenta converter para número (só se o valor começar como um número)
+    if value[:1] in _NUMBER_LEADING_CHARS:
         try:
-            datetime.strptime(value, pattern)
-            return 'date'
+            float(value)
+            return 'number'
         except ValueError:
             pass
     
+    # Identifica o formato de data pelo formato da string e valida uma única vez
+    date_match = _DATE_SHAPE_RE.match(value)
+    if date_match:
+        date_pattern = _DATE_PATTERNS.get(
+            (date_match.group('ymd') is not None, date_match.group('sep1') or date_match.group('sep2'),
+             date_match.group('time') is not None)
+        )
+        if date_pattern:
+            try:
+                datetime.strptime(value, date_pattern)
+                return 'date'
+            except ValueError:
+                pass
+    
     # Se não for número nem data, é texto
     return 'text'
 
-def reconstruct_sql_query(original_query: str, modified_conditions: List[Dict[str, Any]]) -> str:
+def reconstruct_sql_query(original_query: str, modified_conditions: List[Condition]) -> str:
     """
     Reconstrói a consulta SQL substituindo as condições originais pelas modificadas.
     
@@ -303,33 +606,25 @@ def reconstruct_sql_query(original_query: str, modified_conditions: List[Dict[st
     """
     try:
         # Método simplificado que substitui toda a consulta SQL
-        # Encontramos as partes da consulta antes e depois do WHERE
-        
-        # Normaliza a consulta para identificar mais facilmente o WHERE
-        formatted_query = sqlparse.format(original_query, strip_comments=True)
+        # Encontramos a parte da consulta antes do WHERE (em cache por consulta)
+        before_where = _locate_where(original_query)
         
-        # Verificamos se a consulta contém WHERE - usamos regex mais simples
-        match = re.search(r'(?i)(.*)\s+WHERE\s+(.*)', formatted_query, re.DOTALL)
-        
-        if not match:
+        if before_where is None:
             # Se não encontrarmos WHERE, retornamos a consulta original
-            logging.warning("Não foi possível identificar a cláusula WHERE na consulta")
+            logger.warning("Não foi possível identificar a cláusula WHERE na consulta")
             return original_query
             
         # Constrói a nova cláusula WHERE com as condições modificadas
         new_where_clause = construct_where_clause(modified_conditions)
         
-        # Reconstrói a consulta
-        before_where = match.group(1)  # Parte antes do WHERE
-        
         # Com o regex simplificado, não há grupo 3, então não há after_where
         reconstructed = f"{before_where} WHERE {new_where_clause}"
         
-        logging.debug(f"Consulta reconstruída: {reconstructed}")
+        logger.debug("Consulta reconstruída: %s", reconstructed)
         return reconstructed
         
     except Exception as e:
-        logging.error(f"Erro ao reconstruir a consulta SQL: {str(e)}")
+        logger.error("Erro ao reconstruir a consulta SQL: %s", e)
         # Em caso de erro, retorna a consulta original com as condições
         # substituídas de forma simples (fallback)
         
@@ -338,19 +633,54 @@ def reconstruct_sql_query(original_query: str, modified_conditions: List[Dict[st
             new_where_clause = construct_where_clause(modified_conditions)
             
             # Faz uma substituição simples de tudo após o WHERE
-            pattern = r'(?i)(.*\s+WHERE\s+).*?(\s+GROUP BY.*|\s+ORDER BY.*|\s+HAVING.*|\s+LIMIT.*|;|$)'
-            if re.search(pattern, original_query):
-                return re.sub(pattern, fr'\1{new_where_clause}\2', original_query)
+            if _FALLBACK_WHERE_RE.search(original_query):
+                return _FALLBACK_WHERE_RE.sub(fr'\1{new_where_clause}\2', original_query)
             else:
                 # Se não encontrarmos o padrão completo, tentamos apenas substituir após o WHERE
-                pattern = r'(?i)(.*\s+WHERE\s+).*?($)'
-                return re.sub(pattern, fr'\1{new_where_clause}\2', original_query)
+                return _FALLBACK_WHERE_TAIL_RE.sub(fr'\1{new_where_clause}\2', original_query)
                 
         except Exception as inner_e:
-            logging.error(f"Erro no método de fallback: {str(inner_e)}")
+            logger.error("Erro no método de fallback: %s", inner_e)
             return original_query
 
-def construct_where_clause(conditions: List[Dict[str, Any]]) -> str:
+@functools.lru_cache(maxsize=_QUERY_CACHE_SIZE)
+def _locate_where(original_query: str) -> Optional[str]:
+    """
+    Localiza a parte da consulta que antecede a cláusula WHERE.
+    
+    Args:
+        original_query: String contendo a consulta SQL original
+    
+    Returns:
+        String com a parte antes do WHERE, ou None se não houver WHERE
+    """
+    # Remove os comentários para identificar mais facilmente o WHERE
+    formatted_query = _strip_comments(original_query)
+    
+    # Verificamos se a consulta contém WHERE - usamos regex mais simples
+    match = _WHERE_RECON_RE.search(formatted_query)
+    
+    if not match:
+        return None
+        
+    return match.group(1).rstrip()  # Parte antes do WHERE
+
+def _strip_comments(query: str) -> str:
+    """
+    Remove comentários da consulta, preservando literais e hints (/*+ ... */).
+    
+    Substitui o sqlparse.format(strip_comments=True), que agrupa a consulta
+    inteira só para descartar os comentários.
+    
+    Args:
+        query: String contendo a consulta SQL
+    
+    Returns:
+        Consulta sem os comentários
+    """
+    return _COMMENT_RE.sub(lambda m: m.group(1) or ('' if m.group(0).startswith(('--', '# ')) else ' '), query)
+
+def construct_where_clause(conditions: List[Condition]) -> str:
     """
     Constrói uma cláusula WHERE a partir das condições fornecidas.
     
@@ -361,39 +691,60 @@ def construct_where_clause(conditions: List[Dict[str, Any]]) -> str:
         String contendo a cláusula WHERE construída
     """
     where_parts = []
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
     
     for condition in conditions:
-        field = condition.get('field', '')
-        operator = condition.get('operator', '')
-        value = condition.get('value')
-        value_type = condition.get('type', 'text')
-        is_function = condition.get('is_function', False)
-        
         # Debug para verificar como os valores estão chegando
-        logging.debug(f"Processando condição: campo={field}, operador={operator}, valor={value}, tipo={value_type}")
+        if debug_enabled:
+            logger.debug("Processando condição: campo=%s, operador=%s, valor=%r, tipo=%s",
+                         condition.field, condition.operator, condition.value, condition.type)
         
-        if operator.upper() in ('IS NULL', 'IS NOT NULL'):
-            where_parts.append(f"{field} {operator}")
-        elif operator.upper() in ('BETWEEN', 'NOT BETWEEN') and isinstance(value, list) and len(value) == 2:
-            if is_function:
-                # Para condições especiais como to_date()
-                where_parts.append(f"{field} {operator} {value[0]} AND {value[1]}")
-            else:
-                # Para BETWEEN normal
-                formatted_values = [format_value(v, value_type) for v in value]
-                where_parts.append(f"{field} {operator} {formatted_values[0]} AND {formatted_values[1]}")
-        elif operator.upper() in ('IN', 'NOT IN') and isinstance(value, list):
-            formatted_values = [format_value(v, value_type) for v in value]
-            where_parts.append(f"{field} {operator} ({', '.join(formatted_values)})")
-        else:
-            formatted_value = format_value(value, value_type)
-            where_parts.append(f"{field} {operator} {formatted_value}")
+        # Escolhe o formatador pelo tipo de operador (uma única consulta ao dicionário)
+        formatter = _CLAUSE_FORMATTERS.get(condition.operator.upper(), _format_comparison_clause)
+        where_parts.append(formatter(condition))
     
     # Log da cláusula WHERE construída
     result = " AND ".join(where_parts)
-    logging.debug(f"Cláusula WHERE construída: {result}")
+    logger.debug("Cláusula WHERE construída: %s", result)
     return result
 
+def _format_null_clause(condition: Condition) -> str:
+    """Formata IS NULL / IS NOT NULL."""
+    return f"{condition.field} {condition.operator}"
+
+def _format_between_clause(condition: Condition) -> str:
+    """Formata BETWEEN / NOT BETWEEN (valores como lista de dois limites)."""
+    value = condition.value
+    if not isinstance(value, list) or len(value) != 2:
+        return _format_comparison_clause(condition)
+    if condition.is_function:
+        # Para condições especiais como to_date()
+        return f"{condition.field} {condition.operator} {value[0]} AND {value[1]}"
+    # Para BETWEEN normal
+    return (f"{condition.field} {condition.operator} "
+            f"{format_value(value[0], condition.type)} AND {format_value(value[1], condition.type)}")
+
+def _format_in_clause(condition: Condition) -> str:
+    """Formata IN / NOT IN (valores como lista)."""
+    if not isinstance(condition.value, list):
+        return _format_comparison_clause(condition)
+    formatted_values = [format_value(v, condition.type) for v in condition.value]
+    return f"{condition.field} {condition.operator} ({', '.join(formatted_values)})"
+
+def _format_comparison_clause(condition: Condition) -> str:
+    """Formata os operadores padrão, com um único valor."""
+    return f"{condition.field} {condition.operator} {format_value(condition.value, condition.type)}"
+
+# Tabela de despacho: operador -> função que monta o trecho da cláusula WHERE
+_CLAUSE_FORMATTERS = {
+    'IS NULL': _format_null_clause,
+    'IS NOT NULL': _format_null_clause,
+    'BETWEEN': _format_between_clause,
+    'NOT BETWEEN': _format_between_clause,
+    'IN': _format_in_clause,
+    'NOT IN': _format_in_clause,
+}
+
 def format_value(value: Any, value_type: str) -> str:
     """
     Formata um valor de acordo com seu tipo para uso em uma consulta SQL.
@@ -409,7 +760,8 @@ def format_value(value: Any, value_type: str) -> str:
         return 'NULL'
     
     # Loga o valor e tipo para debug    
-    logging.debug(f"Formatando valor: {value} (tipo: {value_type})")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Formatando valor: %s (tipo: %s)", value, value_type)
     
     # Verifica se o valor já tem formato especial (como funções SQL)
     if isinstance(value, str) and 'to_date(' in value.lower():
@@ -425,7 +777,7 @@ def format_value(value: Any, value_type: str) -> str:
             return str(value)
         except (ValueError, TypeError):
             # Se não for um número válido, retorna como texto
-            logging.warning(f"Valor '{value}' não é um número válido. Retornando como texto.")
+            logger.warning("Valor '%s' não é um número válido. Retornando como texto.", value)
             return f"'{value}'"
     elif value_type == 'date':
         # Tratamento especial para datas vazias
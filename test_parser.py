@@ -1,24 +1,105 @@
+import io
 import json
-import logging
-from sql_parser import parse_sql_query, reconstruct_sql_query
+from dataclasses import asdict
+from unittest import mock
+import sql_parser
+from sql_parser import parse_sql_batch, parse_sql_query, reconstruct_sql_query
 
-# Configurar logging
-logging.basicConfig(level=logging.DEBUG)
+# Verificações de regressão
+def campos(sql):
+    return [c.field for c in parse_sql_query(sql)]
 
-# Carregar o arquivo SQL
-with open('teste_to_date.sql', 'r') as file:
-    query = file.read()
+def reconstruir(sql, novo_valor):
+    condicoes = parse_sql_query(sql)
+    condicoes[0].value = novo_valor
+    return reconstruct_sql_query(sql, condicoes)
 
-# Analisar a consulta
-conditions = parse_sql_query(query)
+def verificar_condicoes():
+    # Consulta inteira entre parênteses ainda tem o WHERE encontrado
+    assert campos("(SELECT * FROM t WHERE a = 1)") == ['a']
+    # O WHERE externo prevalece sobre o da subconsulta
+    assert campos("SELECT * FROM (SELECT * FROM u WHERE q = 1) s WHERE r = 2") == ['r']
+    # Faixas TO_DATE adjacentes não engolem a condição seguinte, com AND ou OR
+    for conector in ('AND', 'OR'):
+        assert campos(
+            "SELECT * FROM t WHERE d BETWEEN to_date(:a, 'YYYY') AND to_date(:b, 'YYYY') "
+            f"{conector} e NOT BETWEEN to_date(:c, 'YYYY') AND to_date(:d, 'YYYY') {conector} x = 1"
+        ) == ['d', 'e', 'x']
 
-# Exibir as condições extraídas em formato JSON
-print("Condições extraídas:")
-print(json.dumps(conditions, indent=2, ensure_ascii=False))
+def verificar_reconstrucao():
+    # Comentário '# ' (MySQL) é removido antes de localizar o WHERE
+    assert reconstruir("DELETE FROM pedidos # limpeza\nWHERE id = 1", '5') == 'DELETE FROM pedidos WHERE id = 5'
+    # Aspas escapadas com barra invertida não encerram o literal
+    assert reconstruir("UPDATE t SET nome = 'O\\'Brien -- x' WHERE id = 1", '5') == (
+        "UPDATE t SET nome = 'O\\'Brien -- x' WHERE id = 5"
+    )
 
-# Reconstruir a consulta SQL
-reconstructed_query = reconstruct_sql_query(query, conditions)
+# Script com várias instruções e trechos que só contêm comentários
+INSTRUCOES = [f"SELECT * FROM t WHERE a = {i} AND b IN (1, {i})" for i in range(6)]
+INSTRUCOES.append("SELECT * FROM u WHERE c = 'x' OR d IS NULL")
+SCRIPT = ";\n".join(INSTRUCOES[:3]) + ";\n-- só comentário\n;\n/* bloco */;\n" + ";\n".join(INSTRUCOES[3:]) + ";"
 
-# Exibir a consulta reconstruída
-print("\nConsulta reconstruída:")
-print(reconstructed_query)
\ No newline at end of file
+def verificar_lote():
+    esperado = [(instrucao, parse_sql_query(instrucao)) for instrucao in INSTRUCOES]
+
+    # Em série (um processador) e no pool de processos, com o mesmo resultado
+    with mock.patch('os.cpu_count', return_value=1):
+        assert parse_sql_batch(SCRIPT) == esperado
+    with mock.patch('os.cpu_count', return_value=4):
+        assert parse_sql_batch(SCRIPT) == esperado
+        executor = sql_parser._batch_executor
+        assert executor is not None
+
+        # Pool quebrado: o lote é analisado em série e o próximo cria outro pool
+        for processo in list(executor._processes.values()):
+            processo.kill()
+            processo.join()
+        assert parse_sql_batch(SCRIPT) == esperado
+        assert sql_parser._batch_executor is None
+        assert parse_sql_batch(SCRIPT) == esperado
+        assert sql_parser._batch_executor is not None
+
+def verificar_rotas_lote():
+    from app import app
+    cliente = app.test_client()
+    esperado = [{'query': instrucao, 'conditions': campos(instrucao)} for instrucao in INSTRUCOES]
+
+    def resumo(statements):
+        return [{'query': s['query'], 'conditions': [c['field'] for c in s['conditions']]} for s in statements]
+
+    resposta = cliente.post('/parse_query', data={'query': SCRIPT, 'batch': '1'})
+    assert resposta.status_code == 200
+    assert resumo(resposta.get_json()['statements']) == esperado
+
+    resposta = cliente.post('/upload_sql', data={
+        'sqlFile': (io.BytesIO(SCRIPT.encode('utf-8')), 'lote.sql'),
+        'batch': '1'
+    })
+    assert resposta.status_code == 200
+    assert resposta.get_json()['query'] == SCRIPT
+    assert resumo(resposta.get_json()['statements']) == esperado
+
+if __name__ == '__main__':
+    # Carregar o arquivo SQL
+    with open('teste_to_date.sql', 'r') as file:
+        query = file.read()
+
+    # Analisar a consulta
+    conditions = parse_sql_query(query)
+
+    # Exibir as condições extraídas em formato JSON
+    print("Condições extraídas:")
+    print(json.dumps([asdict(c) for c in conditions], indent=2, ensure_ascii=False))
+
+    # Reconstruir a consulta SQL
+    reconstructed_query = reconstruct_sql_query(query, conditions)
+
+    # Exibir a consulta reconstruída
+    print("\nConsulta reconstruída:")
+    print(reconstructed_query)
+
+    verificar_condicoes()
+    verificar_reconstrucao()
+    verificar_lote()
+    verificar_rotas_lote()
+    print("\nVerificações de regressão OK")